@@ -38,8 +38,19 @@ except ImportError:
             Command.set_undefined_options(self, opt, val)
 
 def get_version():
+    import os
     import re
     import subprocess
+    # Without a .git entry (e.g. an sdist written by local_sdist), use the
+    # VERSION file.  In a checkout or worktree always ask git, since tags,
+    # commits and uncommitted edits can all change the version.
+    root = os.path.abspath(os.path.dirname(__file__))
+    version_file = os.path.join(root, 'VERSION')
+    if not os.path.exists(os.path.join(root, '.git')) \
+            and os.path.exists(version_file):
+        with open(version_file, 'rb') as f:
+            version = f.read().decode('ascii').strip()
+        return version, version
     # git describe a commit using the most recent tag reachable from it.
     # Release tags start with v* (XXX what about other tags starting with v?)
     # and are of the form `v1.1.2`.
@@ -18,14 +18,9 @@ import csv
 import itertools
 import os
 
-import loom.cleanse
-import loom.tasks
+import numpy as np
 import pandas as pd
 
-from distributions.io.stream import json_load
-from distributions.io.stream import open_compressed
-from loom.cFormat import assignment_stream_load
-
 from cgpm.mixtures.view import View
 from cgpm.utils import config as cu
 from cgpm.utils.parallel_map import parallel_map
@@ -72,6 +67,8 @@ def _generate_project_paths(name=None):
 
 def _loom_cross_cat(path, sample):
     """Return the loom CrossCat structure at `path`, whose id is `sample`."""
+    import loom.schema_pb2
+    from distributions.io.stream import open_compressed
     model_in = os.path.join(
         path, 'samples', 'sample.%d' % (sample,), 'model.pb.gz')
     cross_cat = loom.schema_pb2.CrossCat()
@@ -103,6 +100,7 @@ def _retrieve_column_partition(path, sample):
 
 def _retrieve_featureid_to_cgpm(path):
     """Returns a dict mapping loom's 0-based featureid to cgpm.outputs."""
+    from distributions.io.stream import json_load
     # Loom orders features alphabetically based on statistical types:
     # i.e. 'bb' < 'dd' < 'nich'. The ordering is stored in
     # `ingest/encoding.json.gz`.
@@ -121,19 +119,25 @@ def _retrieve_row_partitions(path, sample):
 
     The returned structure is of the form `cgpm.crosscat.state.State.Zrv`.
     """
+    from loom.cFormat import assignment_stream_load
     cross_cat = _loom_cross_cat(path, sample)
     num_kinds = len(cross_cat.kinds)
     assign_in = os.path.join(
         path, 'samples', 'sample.%d' % (sample,), 'assign.pbs.gz')
-    assignments = {
-        a.rowid: [a.groupids(k) for k in xrange(num_kinds)]
-        for a in assignment_stream_load(assign_in)
-    }
-    rowids = sorted(assignments)
-    return {
-        k: [assignments[rowid][k] for rowid in rowids]
-        for k in xrange(num_kinds)
-    }
+    # Stream the assignments into a matrix, doubling capacity as needed.
+    rowids = np.empty(1024, dtype=np.int64)
+    Z = np.empty((1024, num_kinds), dtype=np.int32)
+    num_rows = 0
+    for a in assignment_stream_load(assign_in):
+        if num_rows == len(rowids):
+            rowids = np.resize(rowids, 2*num_rows)
+            Z = np.resize(Z, (2*num_rows, num_kinds))
+        rowids[num_rows] = a.rowid
+        for k in xrange(num_kinds):
+            Z[num_rows, k] = a.groupids(k)
+        num_rows += 1
+    Z = Z[np.argsort(rowids[:num_rows])]
+    return {k: Z[:,k].tolist() for k in xrange(num_kinds)}
 
 
 def _update_state(state, path, sample):
@@ -209,13 +213,14 @@ def _validate_transition(
 
 def _write_dataset(state, path):
     """Write a csv file of `state.X` to the file at `path`."""
-    frame = pd.DataFrame([state.X[i] for i in state.outputs]).T
+    data = np.column_stack([state.X[i] for i in state.outputs])
+    frame = pd.DataFrame(
+        data, columns=_generate_column_names(state), copy=False)
     assert frame.shape == (state.n_rows(), state.n_cols())
-    frame.columns = _generate_column_names(state)
     # Update columns which can be safely converted to int.
-    for col in frame.columns:
-        if all(frame[col] == frame[col]//1):
-            frame[col] = frame[col].astype(int)
+    is_int = np.all(np.mod(data, 1) == 0, axis=0)
+    int_cols = frame.columns[is_int]
+    frame[int_cols] = frame[int_cols].astype(int)
     frame.to_csv(path, na_rep='', index=False)
 
 
@@ -241,6 +246,8 @@ def initialize(state):
     |- ingest
     |- ready for: infer
     """
+    import loom.cleanse
+    import loom.tasks
     paths = _generate_project_paths()
 
     # Write dataset and schema csv files.
@@ -267,6 +274,7 @@ def transition(
         state, N=None, S=None, kernels=None, seed=None, checkpoint=None,
         progress=None):
     """Runs full Gibbs sweeps of all kernels on the cgpm.state.State object."""
+    import loom.tasks
 
     # Check compatible transition parameters.
     _validate_transition(
@@ -302,6 +310,7 @@ def transition_engine(
     Implemented separately to use Loom multiprocessing, and share a single
     Loom project among several cgpm states (Loom samples).
     """
+    import loom.tasks
 
     # Check compatible transition parameters.
     _validate_transition(
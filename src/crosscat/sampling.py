@@ -24,11 +24,9 @@ from itertools import chain
 
 import numpy as np
 
-from cgpm.primitives.crp import Crp
-
-from cgpm.utils.general import log_normalize
 from cgpm.utils.general import log_pflip
-from cgpm.utils.general import logsumexp
+from cgpm.utils.general import logmeanexp_weighted
+from cgpm.utils.general import logp_crp_fresh
 from cgpm.utils.general import merged
 
 from cgpm.utils.validation import partition_query_evidence
@@ -73,13 +71,13 @@ def view_logpdf(view, rowid, targets, constraints):
     Nk = view.Nk()
     N_rows = len(view.Zr())
     K = view.crp.clusters[0].gibbs_tables(-1)
-    lp_crp = [Crp.calc_predictive_logp(k, N_rows, Nk, view.alpha()) for k in K]
-    lp_constraints = [_logpdf_row(view, constraints, k) for k in K]
+    lp_crp = logp_crp_fresh(N_rows, [Nk[k] for k in K[:-1]], view.alpha())
+    lp_constraints = _logpdf_clusters(view, constraints, K)
     if all(np.isinf(lp_constraints)):
         raise ValueError('Zero density constraints: %s' % (constraints,))
-    lp_cluster = log_normalize(np.add(lp_crp, lp_constraints))
-    lp_targets = [_logpdf_row(view, targets, k) for k in K]
-    return logsumexp(np.add(lp_cluster, lp_targets))
+    lp_cluster = np.add(lp_crp, lp_constraints)
+    lp_targets = _logpdf_clusters(view, targets, K)
+    return logmeanexp_weighted(lp_targets, lp_cluster)
 
 
 def view_simulate(view, rowid, targets, constraints, N):
@@ -88,8 +86,8 @@ def view_simulate(view, rowid, targets, constraints, N):
     Nk = view.Nk()
     N_rows = len(view.Zr())
     K = view.crp.clusters[0].gibbs_tables(-1)
-    lp_crp = [Crp.calc_predictive_logp(k, N_rows, Nk, view.alpha()) for k in K]
-    lp_constraints = [_logpdf_row(view, constraints, k) for k in K]
+    lp_crp = logp_crp_fresh(N_rows, [Nk[k] for k in K[:-1]], view.alpha())
+    lp_constraints = _logpdf_clusters(view, constraints, K)
     if all(np.isinf(lp_constraints)):
         raise ValueError('Zero density constraints: %s' % (constraints,))
     lp_cluster = np.add(lp_crp, lp_constraints)
@@ -107,6 +105,15 @@ def _logpdf_row(view, targets, cluster):
     )
 
 
+def _logpdf_clusters(view, targets, K):
+    """Return joint density of the targets in each cluster of K."""
+    logps = np.zeros(len(K))
+    logps_c = np.empty(len(K))
+    for c, x in targets.iteritems():
+        logps += view.dims[c].logpdf_vector(x, K, out=logps_c)
+    return logps
+
+
 def _simulate_row(view, targets, cluster, N):
     """Return sample of the targets in a fixed cluster."""
     samples = (
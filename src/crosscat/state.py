@@ -1089,7 +1089,7 @@ class State(CGpm):
         logp_data.extend(logp_data_aux)
 
         # Compute the CRP probabilities of each view.
-        logp_crp = self.crp.clusters[0].gibbs_logps(col, m=m)
+        logp_crp = self.crp.clusters[0].gibbs_logps(col, m=m, tables=tables)
         assert len(logp_data) == len(logp_crp)
 
         # Overall view probabilities.
@@ -119,7 +119,7 @@ class Dim(CGpm):
     # logpdf score
 
     def logpdf_score(self):
-        return sum(self.clusters[k].logpdf_score() for k in self.clusters)
+        return math.fsum(c.logpdf_score() for c in self.clusters.itervalues())
 
     # --------------------------------------------------------------------------
     # logpdf
@@ -131,6 +131,29 @@ class Dim(CGpm):
         return cluster.logpdf(rowid, targets, constraints, inputs2) \
             if valid else 0
 
+    def logpdf_vector(self, x, K, out=None):
+        """Compute the predictive logpdf of value x in each cluster k in K.
+
+        Clusters of K which are not instantiated use the auxiliary model. If
+        the model exposes `calc_predictive_logp_clusters`, all the clusters are
+        evaluated in a single vectorized call. Requires an unconditional Dim.
+        """
+        assert not self.is_conditional()
+        if out is None:
+            out = np.empty(len(K))
+        # XXX Same convention as logpdf, which returns 0 if x is nan.
+        if math.isnan(x):
+            out.fill(0)
+            return out
+        clusters = [self.clusters.get(k, self.aux_model) for k in K]
+        if hasattr(self.model, 'calc_predictive_logp_clusters'):
+            out[:] = self.model.calc_predictive_logp_clusters(x, clusters)
+        else:
+            targets = {self.index: x}
+            for i, cluster in enumerate(clusters):
+                out[i] = cluster.logpdf(None, targets)
+        return out
+
     # --------------------------------------------------------------------------
     # Simulate
 
@@ -16,12 +16,14 @@
 
 import itertools
 
+from math import fsum
 from math import isnan
 
 import numpy as np
 
 from cgpm.cgpm import CGpm
 from cgpm.mixtures.dim import Dim
+from cgpm.mixtures.view_kernels import logpdf_row_normal
 from cgpm.network.importance import ImportanceNetwork
 from cgpm.utils import config as cu
 from cgpm.utils import general as gu
@@ -105,6 +107,16 @@ class View(CGpm):
             for i, z in enumerate(Zr):
                 self.crp.incorporate(i, {self.outputs[0]: z}, {-1:0})
 
+        # -- Sufficient statistics ---------------------------------------------
+        # Cache of the suffstats arrays of all-Normal views, rebuilt lazily by
+        # _get_suffstats_normal whenever reset to None. Column _suff_slots[k]
+        # holds cluster k, and columns of dead clusters go to _suff_free.
+        self._suff = None
+        self._suff_slots = {}
+        self._suff_free = []
+        # Scratch buffers for per-row temporaries, see _get_scratch.
+        self._scratch = {}
+
         # -- Dimensions --------------------------------------------------------
         self.dims = dict()
         for i, c in enumerate(self.outputs[1:]):
@@ -134,6 +146,7 @@ class View(CGpm):
     def incorporate_dim(self, dim, reassign=True):
         """Incorporate dim into View. If not reassign, partition should match."""
         dim.inputs[0] = self.outputs[0]
+        self._suff = None
         if reassign:
             self._bulk_incorporate(dim)
         self.dims[dim.index] = dim
@@ -143,6 +156,7 @@ class View(CGpm):
     def unincorporate_dim(self, dim):
         """Remove dim from this View (does not modify)."""
         del self.dims[dim.index]
+        self._suff = None
         self.outputs = self.outputs[:1] + self.dims.keys()
         return dim.logpdf_score()
 
@@ -167,24 +181,39 @@ class View(CGpm):
                 rowid,
                 observation={d: observation[d]},
                 inputs=self._get_input_values(rowid, self.dims[d], k))
+        if self._suff is not None:
+            x_row = [observation[d] for d in self.outputs[1:]]
+            self._update_suffstats_normal(k, x_row, 1)
         # If the user did not specify a cluster assignment, sample one.
         if self.outputs[0] not in observation:
             self.transition_rows(rows=[rowid])
 
     def unincorporate(self, rowid):
+        k = self.Zr(rowid)
+        # Account in the suffstats cache, reading values from the dims since
+        # the dataset entry may have already been removed.
+        if self._suff is not None:
+            x_row = [
+                self.dims[d].clusters[k].data[rowid]
+                if rowid in self.dims[d].Zr else float('nan')
+                for d in self.outputs[1:]
+            ]
+            self._update_suffstats_normal(k, x_row, -1)
         # Unincorporate from dims.
         for dim in self.dims.itervalues():
             dim.unincorporate(rowid)
         # Account.
-        k = self.Zr(rowid)
         self.crp.unincorporate(rowid)
         if k not in self.Nk():
             for dim in self.dims.itervalues():
                 del dim.clusters[k]     # XXX Abstract me!
+            if self._suff is not None:
+                self._free_suffstats_normal(k)
 
     # XXX Major hack to force values of NaN cells in incorporated rowids.
     def force_cell(self, rowid, observation):
         k = self.Zr(rowid)
+        self._suff = None
         for d in observation:
             self.dims[d].unincorporate(rowid)
             inputs = self._get_input_values(rowid, self.dims[d], k)
@@ -247,17 +276,23 @@ class View(CGpm):
     def transition_rows(self, rows=None):
         if rows is None:
             rows = self.Zr().keys()
+        else:
+            Zr = self.Zr()
+            missing = [rowid for rowid in rows if rowid not in Zr]
+            if missing:
+                raise ValueError('Rowids not incorporated: %s' % (missing,))
         rows = self.rng.permutation(rows)
+        # Select the row kernel once per sweep; hypers are fixed meanwhile.
+        hypers_normal = self._get_hypers_normal() if self._is_normal() else None
         for rowid in rows:
-            self._gibbs_transition_row(rowid)
+            self._gibbs_transition_row(rowid, hypers_normal)
 
     # --------------------------------------------------------------------------
     # logscore.
 
     def logpdf_likelihood(self):
         """Compute the logpdf of the observations only."""
-        logp_dims = [dim.logpdf_score() for dim in self.dims.itervalues()]
-        return sum(logp_dims)
+        return fsum(dim.logpdf_score() for dim in self.dims.itervalues())
 
     def logpdf_prior(self):
         logp_crp = self.crp.logpdf_score()
@@ -317,16 +352,15 @@ class View(CGpm):
             # = \sum_k p(xT|z=k,xC)p(z=k|xC)            marginalization
             # Now consider p(z=k|xC) \propto p(z=k,xC)  Bayes rule
             # p(z=K[i],xC)                              lp_constraints_unorm[i]
-            # p(z=K[i]|xC)                              lp_constraints[i]
             # p(xT|z=K[i],xC)                           lp_targets[i]
+            # where p(z=K[i]|xC) is normalized by logmeanexp_weighted.
             K = self.crp.clusters[0].gibbs_tables(-1)
             constraints = [merged(constraints, {self.outputs[0]: k}) for k in K]
             lp_constraints_unorm = [network.logpdf(rowid, const, None, inputs)
                 for const in constraints]
-            lp_constraints = gu.log_normalize(lp_constraints_unorm)
             lp_targets = [network.logpdf(rowid, targets, const, inputs)
                 for const in constraints]
-            return gu.logsumexp(np.add(lp_constraints, lp_targets))
+            return gu.logmeanexp_weighted(lp_targets, lp_constraints_unorm)
 
     # --------------------------------------------------------------------------
     # simulate
@@ -390,12 +424,13 @@ class View(CGpm):
     # --------------------------------------------------------------------------
     # Internal row transition.
 
-    def _gibbs_transition_row(self, rowid):
+    def _gibbs_transition_row(self, rowid, hypers_normal=None):
         # Probability of row crp assignment to each cluster.
-        K = self.crp.clusters[0].gibbs_tables(rowid)
-        logp_crp = self.crp.clusters[0].gibbs_logps(rowid)
+        crp = self.crp.clusters[0]
+        K = crp.gibbs_tables(rowid)
+        logp_crp = crp.gibbs_logps(rowid, tables=K)
         # Probability of row data in each cluster.
-        logp_data = self._logpdf_row_gibbs(rowid, K)
+        logp_data = self._logpdf_row_gibbs(rowid, K, hypers_normal)
         assert len(logp_data) == len(logp_crp)
         # Sample new cluster.
         p_cluster = np.add(logp_data, logp_crp)
@@ -405,9 +440,38 @@ class View(CGpm):
             self._migrate_row(rowid, z_b)
         self._check_partitions()
 
-    def _logpdf_row_gibbs(self, rowid, K):
-        return [sum([self._logpdf_cell_gibbs(rowid, dim, k)
-            for dim in self.dims.itervalues()]) for k in K]
+    def _logpdf_row_gibbs(self, rowid, K, hypers_normal=None):
+        if hypers_normal is not None or self._is_normal():
+            return self._logpdf_row_gibbs_normal(rowid, K, hypers_normal)
+        logps = np.zeros(len(K))
+        logps_dim = self._get_scratch('logps_dim', len(K))
+        k_rowid = self.Zr(rowid)
+        for dim in self.dims.itervalues():
+            if dim.is_conditional():
+                logps += [self._logpdf_cell_gibbs(rowid, dim, k) for k in K]
+                continue
+            # Predictive in all clusters at once, then correct the cluster of
+            # rowid, which requires unincorporating rowid.
+            dim.logpdf_vector(self.X[dim.index][rowid], K, out=logps_dim)
+            logps_dim[K.index(k_rowid)] = \
+                self._logpdf_cell_gibbs(rowid, dim, k_rowid)
+            logps += logps_dim
+        return logps
+
+    def _logpdf_row_gibbs_normal(self, rowid, K, hypers_normal=None):
+        if hypers_normal is None:
+            hypers_normal = self._get_hypers_normal()
+        x_row = np.asarray([self.X[c][rowid] for c in self.outputs[1:]])
+        N, sum_x, sum_x_sq = self._get_suffstats_normal(K)
+        # Remove rowid from its own cluster to compute the Gibbs predictive,
+        # without unincorporating rowid from the dims.
+        j = K.index(self.Zr(rowid))
+        valid = ~np.isnan(x_row)
+        N[valid,j] -= 1
+        sum_x[valid,j] -= x_row[valid]
+        sum_x_sq[valid,j] -= x_row[valid]**2
+        m, r, s, nu = hypers_normal
+        return logpdf_row_normal(x_row, N, sum_x, sum_x_sq, m, r, s, nu)
 
     def _logpdf_cell_gibbs(self, rowid, dim, k):
         targets = {dim.index: self.X[dim.index][rowid]}
@@ -442,6 +506,72 @@ class View(CGpm):
         Zr = self.crp.clusters[0].data
         return Zr[rowid] if rowid is not None else Zr
 
+    def _is_normal(self):
+        return all(dim.cctype == 'normal' for dim in self.dims.itervalues())
+
+    def _get_hypers_normal(self):
+        """Return length D arrays m, r, s, nu of the Normal dims."""
+        dims = [self.dims[c] for c in self.outputs[1:]]
+        return np.asarray(
+            [[dim.hypers[h] for dim in dims] for h in ['m', 'r', 's', 'nu']],
+            dtype=float)
+
+    def _get_suffstats_normal(self, K):
+        """Return D x len(K) arrays N, sum_x, sum_x_sq of the Normal dims
+        (ordered as in self.outputs[1:]) in each cluster of K."""
+        if self._suff is None:
+            self._build_suffstats_normal()
+        # Uninstantiated clusters read the reserved empty column 0.
+        slots = [self._suff_slots.get(k, 0) for k in K]
+        return [self._suff[s][:,slots] for s in ['N', 'sum_x', 'sum_x_sq']]
+
+    def _build_suffstats_normal(self):
+        dims = [self.dims[c] for c in self.outputs[1:]]
+        ks = self.Nk().keys()
+        capacity = 2 * (len(ks) + 1)
+        self._suff = {
+            stat: np.zeros((len(dims), capacity))
+            for stat in ['N', 'sum_x', 'sum_x_sq']
+        }
+        self._suff_slots = {k: j for j, k in enumerate(ks, start=1)}
+        self._suff_free = range(capacity-1, len(ks), -1)
+        for i, dim in enumerate(dims):
+            for k, cluster in dim.clusters.iteritems():
+                j = self._suff_slots[k]
+                self._suff['N'][i,j] = cluster.N
+                self._suff['sum_x'][i,j] = cluster.sum_x
+                self._suff['sum_x_sq'][i,j] = cluster.sum_x_sq
+
+    def _update_suffstats_normal(self, k, x_row, sign):
+        if k not in self._suff_slots:
+            # Out of columns, rebuild with more capacity on next access.
+            if not self._suff_free:
+                self._suff = None
+                return
+            self._suff_slots[k] = self._suff_free.pop()
+        j = self._suff_slots[k]
+        x_row = np.asarray(x_row, dtype=float)
+        valid = ~np.isnan(x_row)
+        x = x_row[valid]
+        self._suff['N'][valid,j] += sign
+        self._suff['sum_x'][valid,j] += sign * x
+        self._suff['sum_x_sq'][valid,j] += sign * (x*x)
+
+    def _free_suffstats_normal(self, k):
+        # Recycle the column of dead cluster k, cluster ids are never compacted.
+        j = self._suff_slots.pop(k)
+        for stat in self._suff.itervalues():
+            stat[:,j] = 0
+        self._suff_free.append(j)
+
+    def _get_scratch(self, name, size):
+        """Return an uninitialized length size array, whose storage is reused
+        across calls and only reallocated when size outgrows it."""
+        buf = self._scratch.get(name)
+        if buf is None or len(buf) < size:
+            buf = self._scratch[name] = np.empty(2*size)
+        return buf[:size]
+
     # --------------------------------------------------------------------------
     # Internal query utils.
 
@@ -550,6 +680,14 @@ class View(CGpm):
             all_ks = dim.clusters.keys() + dim.Zi.values()
             assert set(all_ks) == set(Nk.keys())
             for k in dim.clusters:
+                # Cache of suffstats agrees with the clusters.
+                if self._suff is not None:
+                    i_dim = self.outputs[1:].index(i)
+                    j = self._suff_slots[k]
+                    assert np.allclose(
+                        self._suff['N'][i_dim,j], dim.clusters[k].N)
+                    assert np.allclose(
+                        self._suff['sum_x'][i_dim,j], dim.clusters[k].sum_x)
                 # Law of conservation of rowids.
                 rowids_k = [r for r in rowids if Zr[r]==k]
                 cols = [dim.index]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2015-2016 MIT Probabilistic Computing Project
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+'''
+Kernels for View row transitions specialized to particular cctypes, which
+operate on arrays of sufficient statistics of all the dims at once rather
+than querying each (dim, cluster) through the cgpm interface.
+'''
+
+import numpy as np
+
+from cgpm.primitives.normal import Normal
+
+
+def logpdf_row_normal(x_row, N, sum_x, sum_x_sq, m, r, s, nu):
+    """Compute joint predictive density of a row in each cluster of a view
+    whose dims are all Normal.
+
+    Parameters
+    ----------
+    x_row : np.ndarray
+        Length D array of the row values, where nan values are skipped.
+    N, sum_x, sum_x_sq : np.ndarray
+        D x K arrays of Normal sufficient statistics, where row d holds the
+        statistics of the K candidate clusters of dim d.
+    m, r, s, nu : np.ndarray
+        Length D arrays of Normal hyperparameters of each dim.
+
+    Returns
+    -------
+    logps : np.ndarray
+        Length K array, where logps[k] is the density of x_row in cluster k.
+    """
+    valid = ~np.isnan(x_row)
+    logps = Normal.calc_predictive_logp_array(
+        x_row[valid, np.newaxis],
+        N[valid], sum_x[valid], sum_x_sq[valid],
+        m[valid, np.newaxis], r[valid, np.newaxis],
+        s[valid, np.newaxis], nu[valid, np.newaxis])
+    return np.sum(logps, axis=0)
@@ -17,6 +17,8 @@
 from collections import OrderedDict
 from math import log
 
+import numpy as np
+
 from scipy.special import gammaln
 
 from cgpm.primitives.distribution import DistributionGpm
@@ -108,20 +110,27 @@ class Crp(DistributionGpm):
 
     # Some Gibbs utils.
 
-    def gibbs_logps(self, rowid, m=1):
+    def gibbs_logps(self, rowid, m=1, tables=None):
         """Compute the CRP probabilities for a Gibbs transition of rowid,
-        with table counts Nk, table assignments Z, and m auxiliary tables."""
+        with table counts Nk, table assignments Z, and m auxiliary tables.
+
+        If the caller already has the output of gibbs_tables(rowid, m), it
+        may pass it as tables to avoid recomputing it."""
         assert rowid in self.data
         assert 0 < m
         singleton = self.singleton(rowid)
         p_aux = self.alpha / float(m)
         p_rowid = p_aux if singleton else self.counts[self.data[rowid]]-1
-        tables = self.gibbs_tables(rowid, m=m)
-        def p_table(t):
-            if t == self.data[rowid]: return p_rowid    # rowid table.
-            if t not in self.counts: return p_aux       # auxiliary table.
-            return self.counts[t]                       # regular table.
-        return [log(p_table(t)) for t in tables]
+        if tables is None:
+            tables = self.gibbs_tables(rowid, m=m)
+        # Regular tables are the prefix of tables, auxiliary tables the rest.
+        K = len(self.counts)
+        p_tables = np.empty(len(tables))
+        p_tables[:K] = np.fromiter(
+            (self.counts[t] for t in tables[:K]), dtype=float, count=K)
+        p_tables[K:] = p_aux
+        p_tables[tables.index(self.data[rowid])] = p_rowid
+        return np.log(p_tables, out=p_tables)
 
     def gibbs_tables(self, rowid, m=1):
         """Retrieve a list of possible tables for rowid.
@@ -184,5 +193,5 @@ class Crp(DistributionGpm):
     @staticmethod
     def calc_logpdf_marginal(N, counts, alpha):
         # http://gershmanlab.webfactional.com/pubs/GershmanBlei12.pdf#page=4 (eq 8)
-        return len(counts) * log(alpha) + sum(gammaln(counts.values())) \
+        return len(counts) * log(alpha) + np.sum(gammaln(counts.values())) \
             + gammaln(alpha) - gammaln(N + alpha)
@@ -20,6 +20,8 @@ from math import pi
 
 import numpy as np
 
+from scipy.special import gammaln
+
 from cgpm.primitives.distribution import DistributionGpm
 from cgpm.utils import general as gu
 
@@ -82,16 +84,20 @@ class Normal(DistributionGpm):
             x, self.N, self.sum_x, self.sum_x_sq, self.m, self.r,
             self.s, self.nu)
 
-    @gu.simulate_many
     def simulate(self, rowid, targets, constraints=None, inputs=None, N=None):
         DistributionGpm.simulate(self, rowid, targets, constraints, inputs, N)
         if rowid in self.data:
-            return {self.outputs[0]: self.data[rowid]}
+            x = self.data[rowid]
+            return {self.outputs[0]: x} if N is None else \
+                [{self.outputs[0]: x} for _i in xrange(N)]
+        # Draw all N samples at once from the posterior hypers.
         mn, rn, sn, nun = Normal.posterior_hypers(
             self.N, self.sum_x, self.sum_x_sq, self.m, self.r, self.s, self.nu)
-        mu, rho = Normal.sample_parameters(mn, rn, sn, nun, self.rng)
+        mu, rho = Normal.sample_parameters(mn, rn, sn, nun, self.rng, size=N)
         x = self.rng.normal(loc=mu, scale=rho**-.5)
-        return {self.outputs[0]: x}
+        if N is None:
+            return {self.outputs[0]: x}
+        return [{self.outputs[0]: xi} for xi in x.tolist()]
 
     def logpdf_score(self):
         return Normal.calc_logpdf_marginal(
@@ -172,6 +178,32 @@ class Normal(DistributionGpm):
         ZM = Normal.calc_log_Z(rm, sm, num)
         return -.5 * LOG2PI + ZM - ZN
 
+    @staticmethod
+    def calc_predictive_logp_array(x, N, sum_x, sum_x_sq, m, r, s, nu):
+        """Vectorized calc_predictive_logp, where the sufficient statistics
+        N, sum_x, sum_x_sq are arrays (e.g. one entry per cluster). All the
+        arguments are broadcast against one another."""
+        _mn, rn, sn, nun = Normal.posterior_hypers_array(
+            N, sum_x, sum_x_sq, m, r, s, nu)
+        _mm, rm, sm, num = Normal.posterior_hypers_array(
+            N+1, sum_x+x, sum_x_sq+x*x, m, r, s, nu)
+        ZN = Normal.calc_log_Z_array(rn, sn, nun)
+        ZM = Normal.calc_log_Z_array(rm, sm, num)
+        return -.5 * LOG2PI + ZM - ZN
+
+    @staticmethod
+    def calc_predictive_logp_clusters(x, clusters):
+        """Predictive logp of x in each Normal of clusters, which must all
+        have the same hyperparameters."""
+        K = len(clusters)
+        N = np.fromiter((c.N for c in clusters), dtype=float, count=K)
+        sum_x = np.fromiter((c.sum_x for c in clusters), dtype=float, count=K)
+        sum_x_sq = np.fromiter(
+            (c.sum_x_sq for c in clusters), dtype=float, count=K)
+        c = clusters[0]
+        return Normal.calc_predictive_logp_array(
+            x, N, sum_x, sum_x_sq, c.m, c.r, c.s, c.nu)
+
     @staticmethod
     def calc_logpdf_marginal(N, sum_x, sum_x_sq, m, r, s, nu):
         _mn, rn, sn, nun = Normal.posterior_hypers(
@@ -190,6 +222,15 @@ class Normal(DistributionGpm):
             sn = s
         return mn, rn, sn, nun
 
+    @staticmethod
+    def posterior_hypers_array(N, sum_x, sum_x_sq, m, r, s, nu):
+        rn = r + N
+        nun = nu + N
+        mn = (r*m + sum_x)/rn
+        sn = s + sum_x_sq + r*m*m - rn*mn*mn
+        sn = np.where(sn == 0, s, sn)
+        return mn, rn, sn, nun
+
     @staticmethod
     def calc_log_Z(r, s, nu):
         return (
@@ -200,7 +241,16 @@ class Normal(DistributionGpm):
             + lgamma(nu/2.))
 
     @staticmethod
-    def sample_parameters(m, r, s, nu, rng):
-        rho = rng.gamma(nu/2., scale=2./s)
+    def calc_log_Z_array(r, s, nu):
+        return (
+            ((nu + 1.) / 2.) * LOG2
+            + .5 * LOGPI
+            - .5 * np.log(r)
+            - (nu/2.) * np.log(s)
+            + gammaln(nu/2.))
+
+    @staticmethod
+    def sample_parameters(m, r, s, nu, rng, size=None):
+        rho = rng.gamma(nu/2., scale=2./s, size=size)
         mu = rng.normal(loc=m, scale=1./(rho*r)**.5)
         return mu, rho
@@ -16,7 +16,7 @@
 
 import numpy as np
 
-from scipy.misc import logsumexp
+from scipy.special import logsumexp
 from scipy.stats import uniform
 
 from cgpm.cgpm import CGpm
@@ -24,6 +24,7 @@ from math import lgamma
 from math import log
 
 import numpy as np
+import scipy.special
 
 from cgpm.utils import validation as vu
 
@@ -83,7 +84,8 @@ def log_normalize(logp):
 
 def normalize(p):
     """Normalizes a np array of probabilites."""
-    return np.asarray(p, dtype=float) / sum(p)
+    p = np.asarray(p, dtype=float)
+    return p / np.sum(p)
 
 def logp_crp(N, Nk, alpha):
     """Returns the log normalized P(N,K|alpha), where N is the number of
@@ -116,13 +118,19 @@ def logp_crp_gibbs(Nk, Z, i, alpha, m):
 def logp_crp_fresh(N, Nk, alpha, m=1):
     """Compute the CRP probabilities for a fresh customer i=N+1, with
     table counts Nk, total customers N=sum(Nk), and m auxiliary tables."""
-    log_crp_numer = np.log(Nk + [alpha/m]*m)
+    K = len(Nk)
+    crp_numer = np.empty(K + m)
+    crp_numer[:K] = Nk
+    crp_numer[K:] = alpha/float(m)
+    log_crp_numer = np.log(crp_numer, out=crp_numer)
     logp_crp_denom = log(N + alpha)
     return log_crp_numer - logp_crp_denom
 
 def log_pflip(logp, array=None, size=None, rng=None):
     """Categorical draw from a vector logp of log probabilities."""
-    p = np.exp(log_normalize(logp))
+    # Shift by the max instead of the logsumexp, since pflip normalizes.
+    logp = np.asarray(logp, dtype=float)
+    p = np.exp(logp - np.max(logp))
     return pflip(p, array=array, size=size, rng=rng)
 
 def pflip(p, array=None, size=None, rng=None):
@@ -134,8 +142,8 @@ def pflip(p, array=None, size=None, rng=None):
     if rng is None:
         rng = gen_rng()
     p = normalize(p)
-    if 10.**(-8.) < math.fabs(1.-sum(p)):
-        warnings.warn('pflip probability vector sums to %f.' % sum(p))
+    if 10.**(-8.) < math.fabs(1.-np.sum(p)):
+        warnings.warn('pflip probability vector sums to %f.' % np.sum(p))
     return rng.choice(array, size=size, p=p)
 
 def logsumexp(array):
@@ -195,10 +203,14 @@ def logmeanexp_weighted(log_A, log_W):
     #   = logsumexp (log W_0 + log A_0, ..., log W_{n-1} + log A_{n-1})
     #     - logsumexp (log W_0, ..., log W_{n-1})
     #
+    # Both terms are computed by vectorized logsumexps, which avoids
+    # normalizing log_W in a separate pass.
+    #
     # XXX Pathological cases -- infinities, NaNs.
     assert len(log_W) == len(log_A)
-    return logsumexp([log_w + log_a for log_w, log_a in zip(log_W, log_A)]) \
-        - logsumexp(log_W)
+    log_W = np.asarray(log_W, dtype=float)
+    return scipy.special.logsumexp(log_W + log_A) \
+        - scipy.special.logsumexp(log_W)
 
 def log_linspace(a, b, n):
     """linspace from a to b with n entries over log scale."""
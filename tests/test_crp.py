@@ -54,6 +54,9 @@ def assert_crp_equality(alpha, Nk, crp):
         assert np.allclose(
             gu.logp_crp_gibbs(Nk, Z, i, alpha, 1),
             crp.gibbs_logps(rowid))
+        assert np.allclose(
+            crp.gibbs_logps(rowid),
+            crp.gibbs_logps(rowid, tables=crp.gibbs_tables(rowid)))
 
 
 N = [2**i for i in xrange(8)]
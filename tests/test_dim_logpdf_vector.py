@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2015-2016 MIT Probabilistic Computing Project
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+import numpy as np
+
+from cgpm.mixtures.dim import Dim
+from cgpm.utils import general as gu
+
+
+def retrieve_dim(cctype, distargs, X, Zr):
+    dim = Dim(
+        outputs=[0], inputs=[-1], cctype=cctype, distargs=distargs,
+        rng=gu.gen_rng(1))
+    dim.transition_hyper_grids(X)
+    for rowid, (x, k) in enumerate(zip(X, Zr)):
+        dim.incorporate(rowid, {0: x}, {-1: k})
+    return dim
+
+
+@pytest.mark.parametrize('cctype, distargs, X', [
+    ('normal', None, [1.1, -2.3, 4.2, 8.7, .5, 3.2]),
+    ('categorical', {'k': 3}, [0, 1, 2, 1, 1, 0]),
+])
+def test_logpdf_vector_agrees_logpdf(cctype, distargs, X):
+    dim = retrieve_dim(cctype, distargs, X, [0, 0, 1, 1, 1, 3])
+    # Include an uninstantiated cluster, served by the auxiliary model.
+    K = [0, 1, 3, 4]
+    for x in set(X):
+        expected = [dim.logpdf(None, {0: x}, None, {-1: k}) for k in K]
+        assert np.allclose(dim.logpdf_vector(x, K), expected)
+    # Nan values have zero density by convention.
+    assert np.all(dim.logpdf_vector(float('nan'), K) == 0)
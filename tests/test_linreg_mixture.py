@@ -23,16 +23,12 @@ from cgpm.crosscat.state import State
 from cgpm.utils import general as gu
 
 
-def _compute_y(x):
-    noise = [.5, 1]
-    slopes = [-2, 5]
-    model = x > 5
-    return slopes[model] * x  + rng.normal(scale=noise[model])
-
-
 rng = gu.gen_rng(1)
 X = rng.uniform(low=0, high=10, size=50)
-Y = map(_compute_y, X)
+model = (X > 5).astype(np.intp)
+noise = np.asarray([.5, 1.])
+slopes = np.asarray([-2., 5.])
+Y = slopes[model] * X + rng.normal(scale=noise[model])
 D = np.column_stack((X,Y))
 
 
@@ -58,3 +58,13 @@ def test_logmeanexp():
     assert math.isnan(gu.logmeanexp([nan, inf]))
     assert math.isnan(gu.logmeanexp([nan, -3]))
     assert math.isnan(gu.logmeanexp([nan]))
+
+def test_logmeanexp_weighted():
+    inf = float('inf')
+    log_A = [-1., 2., -3.]
+    log_W = [0., -1000., 1.]
+    expected = gu.logsumexp(
+        [a + w - gu.logsumexp(log_W) for a, w in zip(log_A, log_W)])
+    assert relerr(expected, gu.logmeanexp_weighted(log_A, log_W)) < 1e-15
+    assert gu.logmeanexp_weighted([0., 0.], [-3., 4.]) == 0.
+    assert gu.logmeanexp_weighted([-inf, -inf], [-3., 4.]) == -inf
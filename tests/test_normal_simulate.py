@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2015-2016 MIT Probabilistic Computing Project
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from cgpm.primitives.normal import Normal
+from cgpm.utils import general as gu
+
+
+def test_simulate_batched():
+    rng = gu.gen_rng(0)
+    normal = Normal([0], [], rng=gu.gen_rng(1))
+    for rowid, x in enumerate(rng.normal(loc=5, scale=.1, size=100)):
+        normal.incorporate(rowid, {0: x})
+    # Single sample.
+    sample = normal.simulate(None, [0])
+    assert set(sample) == {0}
+    # Batch of samples from the posterior predictive.
+    samples = normal.simulate(None, [0], N=1000)
+    assert len(samples) == 1000
+    assert all(set(s) == {0} for s in samples)
+    assert np.allclose(np.mean([s[0] for s in samples]), 5, atol=.1)
+    # Observed rowid returns the observation N times.
+    samples = normal.simulate(3, [0], N=4)
+    assert samples == [{0: normal.data[3]}] * 4
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2015-2016 MIT Probabilistic Computing Project
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#    http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from cgpm.mixtures.view import View
+from cgpm.utils import general as gu
+
+
+def retrieve_view():
+    rng = gu.gen_rng(0)
+    data = rng.normal(size=(30, 4))
+    data[3,2] = data[7,0] = np.nan
+    outputs = [0,1,2,3]
+    return View(
+        {c: data[:,i].tolist() for i, c in enumerate(outputs)},
+        outputs=[1000] + outputs,
+        cctypes=['normal'] * len(outputs),
+        Zr=[i % 3 for i in xrange(30)],
+        rng=gu.gen_rng(1),
+    )
+
+
+def test_logpdf_row_gibbs_normal_agrees_cells():
+    view = retrieve_view()
+    assert view._is_normal()
+    for rowid in [0, 3, 7, 12]:
+        K = view.crp.clusters[0].gibbs_tables(rowid)
+        logps_kernel = view._logpdf_row_gibbs_normal(rowid, K)
+        logps_cells = [
+            sum(view._logpdf_cell_gibbs(rowid, dim, k)
+                for dim in view.dims.itervalues())
+            for k in K
+        ]
+        assert np.allclose(logps_kernel, logps_cells)
+
+
+def test_suffstats_normal_cache_agrees_dims():
+    view = retrieve_view()
+    view.transition(N=2)
+    assert view._suff is not None
+    K = view.crp.clusters[0].gibbs_tables(-1)
+    cached = view._get_suffstats_normal(K)
+    view._suff = None
+    rebuilt = view._get_suffstats_normal(K)
+    for stat_cached, stat_rebuilt in zip(cached, rebuilt):
+        assert np.allclose(stat_cached, stat_rebuilt)
+
+
+def test_suffstats_normal_cache_recycles_columns():
+    view = retrieve_view()
+    view.transition(N=2)
+    capacity = view._suff['N'].shape[1]
+    # Repeatedly move a row to a fresh cluster with an ever larger id.
+    for _i in xrange(3*capacity):
+        k_fresh = max(view.Nk()) + 1
+        view._migrate_row(0, k_fresh)
+    assert view._suff['N'].shape[1] == capacity
+    assert len(view._suff_slots) == len(view.Nk())
+
+
+def test_logpdf_row_gibbs_agrees_cells():
+    rng = gu.gen_rng(2)
+    data = np.column_stack((
+        rng.normal(size=30),
+        rng.choice(3, size=30),
+        rng.poisson(2, size=30),
+    )).astype(float)
+    data[4,1] = np.nan
+    view = View(
+        {c: data[:,c].tolist() for c in [0,1,2]},
+        outputs=[1000, 0, 1, 2],
+        cctypes=['normal', 'categorical', 'poisson'],
+        distargs=[None, {'k': 3}, None],
+        Zr=[i % 4 for i in xrange(30)],
+        rng=gu.gen_rng(1),
+    )
+    assert not view._is_normal()
+    def check_rows():
+        for rowid in [0, 4, 9]:
+            K = view.crp.clusters[0].gibbs_tables(rowid)
+            logps_cells = [
+                sum(view._logpdf_cell_gibbs(rowid, dim, k)
+                    for dim in view.dims.itervalues())
+                for k in K
+            ]
+            assert np.allclose(view._logpdf_row_gibbs(rowid, K), logps_cells)
+    check_rows()
+    # Grow the number of clusters past the scratch buffers and check again.
+    for rowid in xrange(10, 30):
+        view._migrate_row(rowid, max(view.Nk()) + 1)
+    check_rows()
+
+
+def test_transition_rows_unincorporated_raises():
+    view = retrieve_view()
+    # Unincorporate the last rowid, as State.unincorporate does.
+    view.unincorporate(29)
+    for c in view.outputs[1:]:
+        view.X[c].pop()
+    with pytest.raises(ValueError):
+        view.transition_rows(rows=[4, 29, 28])
+    with pytest.raises(ValueError):
+        view.transition_rows(rows=[100])
+    view.transition_rows(rows=[4, 28])
+    assert view.n_rows() == 29